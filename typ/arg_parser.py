@@ -121,6 +121,10 @@ class ArgumentParser(argparse.ArgumentParser):
                               help=argparse.SUPPRESS)
 
         if running:
+            self.add_argument('--batch-size', metavar='N', type=int,
+                              default=0,
+                              help=('Sends tests to each job N at a time '
+                                    '(defaults to 1).'))
             self.add_argument('-d', '--debugger', action='store_true',
                               help='Runs the tests under the debugger.')
             self.add_argument('-j', '--jobs', metavar='N', type=int,
@@ -157,6 +161,12 @@ class ArgumentParser(argparse.ArgumentParser):
                                     'test run.'))
             self.add_argument('--retry-limit', type=int, default=0,
                               help='Retries each failure up to N times.')
+            self.add_argument('--timings-file', metavar='FILENAME',
+                              action='store',
+                              help=('If specified, runs the slowest tests '
+                                    'first based on the times recorded in '
+                                    'that file, and records the new times '
+                                    'there afterwards.'))
             self.add_argument('--terminal-width', type=int,
                               default=self._host.terminal_width(),
                               help=argparse.SUPPRESS)
@@ -215,6 +225,10 @@ class ArgumentParser(argparse.ArgumentParser):
                                 rargs.total_shards)
             self.exit_status = 2
 
+        if rargs.batch_size < 0:
+            self._print_message('Error: --batch-size must be at least 0')
+            self.exit_status = 2
+
         if not rargs.suffixes:
             rargs.suffixes = DEFAULT_SUFFIXES
 
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import copy
 import io
 import logging
@@ -72,11 +73,23 @@ class FakeHost(object):
         self.stdout = io.StringIO()
         self.stderr = io.StringIO()
 
+    @property
+    def files(self):
+        return self._files
+
+    @files.setter
+    def files(self, files):
+        self._files = _FileDict(files)
+
     def abspath(self, *comps):
         relpath = self.join(*comps)
         if relpath.startswith('/'):
             return relpath
-        return self.join(self.cwd, relpath)
+        if not relpath:
+            return self.cwd
+        if relpath.startswith('.'):
+            return self.join(self.cwd, relpath)
+        return self.cwd + '/' + relpath
 
     def add_to_path(self, *comps):
         absolute_path = self.abspath(*comps)
@@ -113,8 +126,8 @@ class FakeHost(object):
     def files_under(self, top):
         files = []
         top = self.abspath(top)
-        for f in self.files:
-            if self.files[f] is not None and f.startswith(top):
+        for f in self.files.paths_under(top):
+            if self.files.get(f) is not None:
                 files.append(self.relpath(f, top))
         return files
 
@@ -139,16 +152,13 @@ class FakeHost(object):
         return path in self.files and self.files[path] is not None
 
     def join(self, *comps):
-        p = ''
+        parts = []
         for c in comps:
-            if c in ('', '.'):
-                continue
-            elif c.startswith('/'):
-                p = c
-            elif p:
-                p += '/' + c
-            else:
-                p = c
+            if c.startswith('/'):
+                parts = [c]
+            elif c not in ('', '.'):
+                parts.append(c)
+        p = '/'.join(parts)
 
         # Handle ./
         p = p.replace('/./', '/')
@@ -210,10 +220,15 @@ class FakeHost(object):
         self.files[path] = None
         self.written_files[path] = None
 
+    def rename(self, src, dst):
+        contents = self._read([src])
+        self.remove(src)
+        self._write(dst, contents)
+
     def rmtree(self, *comps):
         path = self.abspath(*comps)
-        for f in self.files:
-            if f.startswith(path):
+        for f in self.files.paths_under(path):
+            if f in self.files:
                 self.files[f] = None
                 self.written_files[f] = None
         self.dirs.remove(path)
@@ -243,7 +258,9 @@ class FakeHost(object):
         self.written_files[full_path] = contents
 
     def fetch(self, url, data=None, headers=None):
-        resp = self.fetch_responses.get(url, FakeResponse(unicode(''), url))
+        resp = self.fetch_responses.get(url)
+        if resp is None:
+            resp = FakeResponse(unicode(''), url)
         self.fetches.append((url, data, headers, resp))
         return resp
 
@@ -278,6 +295,47 @@ class FakeHost(object):
         return out, err
 
 
+class _FileDict(dict):
+    """A dict of file contents that also indexes the paths by directory.
+
+    This lets files_under() and rmtree() find the files under a directory
+    without scanning every file in the filesystem.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(_FileDict, self).__init__()
+        self._paths_by_dir = collections.defaultdict(set)
+        self.update(*args, **kwargs)
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def __setitem__(self, path, contents):
+        if path not in self:
+            for d in _parent_dirs(path):
+                self._paths_by_dir[d].add(path)
+        super(_FileDict, self).__setitem__(path, contents)
+
+    def update(self, *args, **kwargs):
+        for path, contents in dict(*args, **kwargs).items():
+            self[path] = contents
+
+    def paths_under(self, top):
+        # Returns a copy, so that callers can modify the dict while
+        # iterating over the result. Paths that have been deleted from
+        # the dict directly may still be returned.
+        return list(self._paths_by_dir.get(top.rstrip('/') or '/', ()))
+
+
+def _parent_dirs(path):
+    idx = path.rfind('/')
+    while idx > 0:
+        yield path[:idx]
+        idx = path.rfind('/', 0, idx)
+    if idx == 0:
+        yield '/'
+
+
 class FakeResponse(io.StringIO):
 
     def __init__(self, response, url, code=200):
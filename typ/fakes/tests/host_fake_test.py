@@ -35,6 +35,26 @@ class TestFakeHost(host_test.TestHost):
         if sys.platform != 'win32':
             super(TestFakeHost, self).test_add_to_path()
 
+    def test_print_to_pipe(self):
+        # FakeHost's streams are all in memory, so unlike Host it flushes
+        # after every line.
+        h = self.host()
+
+        class FakePipe(object):
+
+            def __init__(self):
+                self.flush_called = False
+
+            def write(self, m):
+                pass
+
+            def flush(self):
+                self.flush_called = True
+
+        s = FakePipe()
+        h.print_('hello', stream=s)
+        self.assertTrue(s.flush_called)
+
     def test_call(self):
         h = self.host()
         ret, out, err = h.call(['echo', 'hello, world'])
@@ -81,3 +101,32 @@ class TestFakeHost(host_test.TestHost):
         self.assertEqual(actual_resp.getcode(), 200)
         self.assertEqual(resp, actual_resp)
         self.assertEqual(h.fetches, [(url, None, None, actual_resp)])
+
+    def test_fetch_unregistered_url(self):
+        h = self.host()
+        url = 'http://localhost/other'
+        resp = h.fetch(url)
+        self.assertEqual(resp.read(), '')
+        self.assertEqual(resp.geturl(), url)
+
+        # Callers may close the response, so each fetch gets a new one.
+        resp.close()
+        self.assertEqual(h.fetch(url).read(), '')
+
+    def test_files_under_only_matches_subdirs(self):
+        h = self.host()
+        h.files = {'/tmp/foo/a.txt': 'a', '/tmp/foobar/b.txt': 'b'}
+        h.write_text_file('/tmp/foo/bar/c.txt', 'c')
+        self.assertEqual(sorted(h.files_under('/tmp/foo')),
+                         ['a.txt', 'bar/c.txt'])
+        self.assertEqual(sorted(h.files_under('/tmp')),
+                         ['foo/a.txt', 'foo/bar/c.txt', 'foobar/b.txt'])
+
+    def test_abspath(self):
+        h = self.host()
+        h.cwd = '/tmp'
+        self.assertEqual(h.abspath('foo'), '/tmp/foo')
+        self.assertEqual(h.abspath('./foo'), '/tmp/foo')
+        self.assertEqual(h.abspath('../foo'), '/foo')
+        self.assertEqual(h.abspath('/foo'), '/foo')
+        self.assertEqual(h.abspath(''), '/tmp')
@@ -21,6 +21,7 @@ import subprocess
 import sys
 import tempfile
 import time
+import weakref
 
 
 if sys.version_info.major == 2:  # pragma: python2
@@ -50,6 +51,7 @@ class Host(object):
         self.stdin = sys.stdin
         self.env = os.environ
         self.platform = sys.platform
+        self._isatty_cache = weakref.WeakKeyDictionary()
 
     def abspath(self, *comps):
         return os.path.abspath(self.join(*comps))
@@ -83,6 +85,11 @@ class Host(object):
             self.print_(out, end='')
             self.print_(err, end='', stream=self.stderr)
             return ret
+        # print_() may have left output sitting in the streams' buffers;
+        # it has to go out before the subprocess starts writing.
+        for stream in (self.stdout, self.stderr):
+            if stream:
+                stream.flush()
         return subprocess.call(argv, stdin=self.stdin, stdout=self.stdout,
                                stderr=self.stderr, env=env)
 
@@ -144,7 +151,27 @@ class Host(object):
     def print_(self, msg='', end='\n', stream=None):
         stream = stream or self.stdout
         stream.write(str(msg) + end)
-        stream.flush()
+
+        # Flushing every line is expensive when the output is going to a
+        # pipe or a file, so we leave complete lines in the stream's buffer
+        # unless someone is watching the output as it is written.
+        if end != '\n' or self._isatty(stream):
+            stream.flush()
+
+    def _isatty(self, stream):
+        # Streams we can't ask are treated as interactive, so that they
+        # still get flushed after every line.
+        if not hasattr(stream, 'isatty'):
+            return True
+        try:
+            isatty = self._isatty_cache.get(stream)
+            if isatty is None:
+                isatty = stream.isatty()
+                self._isatty_cache[stream] = isatty
+            return isatty
+        except TypeError:  # pragma: untested
+            # The stream can't be weakly referenced.
+            return stream.isatty()
 
     def read_text_file(self, *comps):
         return self._read(comps, 'r')
@@ -166,6 +193,15 @@ class Host(object):
     def remove(self, *comps):
         os.remove(self.join(*comps))
 
+    def rename(self, src, dst):
+        if hasattr(os, 'replace'):  # pragma: python3
+            os.replace(src, dst)
+        else:  # pragma: python2
+            # os.rename() won't overwrite an existing file on Windows.
+            if sys.platform == 'win32' and os.path.exists(dst):
+                os.remove(dst)
+            os.rename(src, dst)
+
     def rmtree(self, path):
         shutil.rmtree(path, ignore_errors=True)
 
@@ -274,13 +310,23 @@ class _TeedStream(io.StringIO):
             self.stream.flush()
 
     def capture(self, divert=True):
+        self.seek(0)
         self.truncate(0)
         self.capturing = True
         self.diverting = divert
+        if sys.version_info.major == 3:  # pragma: python3
+            if divert:
+                # When we're only capturing, nothing needs converting or
+                # forwarding, so write straight into the buffer.
+                self.write = super(_TeedStream, self).write
+            else:
+                vars(self).pop('write', None)
 
     def restore(self):
         msg = self.getvalue()
         self.truncate(0)
         self.capturing = False
         self.diverting = False
+        if sys.version_info.major == 3:  # pragma: python3
+            vars(self).pop('write', None)
         return msg
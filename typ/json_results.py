@@ -48,6 +48,19 @@ class Result(object):
         self.err = err
         self.pid = pid
 
+    # Results are sent back from the worker processes for every test, so
+    # we pickle them as a plain tuple rather than as a dict of attributes.
+
+    def __getstate__(self):
+        return (self.name, self.actual, self.started, self.took, self.worker,
+                self.expected, self.unexpected, self.flaky, self.code,
+                self.out, self.err, self.pid)
+
+    def __setstate__(self, state):
+        (self.name, self.actual, self.started, self.took, self.worker,
+         self.expected, self.unexpected, self.flaky, self.code,
+         self.out, self.err, self.pid) = state
+
 
 class ResultSet(object):
 
@@ -12,15 +12,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import copy
 import multiprocessing
+import multiprocessing.queues
 import pickle
+import random
+import sys
 import traceback
 
 from typ.host import Host
 
+if sys.version_info.major == 2:  # pragma: python2
+    from Queue import Empty
+else:  # pragma: python3
+    from queue import Empty  # pylint: disable=F0401
 
-def make_pool(host, jobs, callback, context, pre_fn, post_fn):
+
+def make_pool(host, jobs, callback, context, pre_fn=None, post_fn=None):
+    # pre_fn and post_fn may be None, in which case each worker uses the
+    # context as-is and join() returns None for each worker, without
+    # having to call (or pickle) a no-op function.
     _validate_args(context, pre_fn, post_fn)
     if jobs > 1:
         return _ProcessPool(host, jobs, callback, context, pre_fn, post_fn)
@@ -28,68 +40,137 @@ def make_pool(host, jobs, callback, context, pre_fn, post_fn):
         return _AsyncPool(host, jobs, callback, context, pre_fn, post_fn)
 
 
+# How long an idle worker waits on its own queue before trying to steal
+# requests queued up for the other workers.
+_STEAL_TIMEOUT = 0.05
+
+
 class _MessageType(object):
     Request = 'Request'
+    RequestBatch = 'RequestBatch'
     Response = 'Response'
     Close = 'Close'
     Done = 'Done'
     Error = 'Error'
     Interrupt = 'Interrupt'
 
-    values = [Request, Response, Close, Done, Error, Interrupt]
+    values = [Request, RequestBatch, Response, Close, Done, Error, Interrupt]
 
 
 def _validate_args(context, pre_fn, post_fn):
+    # multiprocessing pickles with a binary protocol, so check using
+    # the same one; the default protocol on Python 2 is the slow ASCII one.
     try:
-        _ = pickle.dumps(context)
+        _ = pickle.dumps(context, pickle.HIGHEST_PROTOCOL)
     except Exception as e:
         raise ValueError('context passed to make_pool is not picklable: %s'
                          % str(e))
     try:
-        _ = pickle.dumps(pre_fn)
+        _ = pickle.dumps(pre_fn, pickle.HIGHEST_PROTOCOL)
     except pickle.PickleError:
         raise ValueError('pre_fn passed to make_pool is not picklable')
     try:
-        _ = pickle.dumps(post_fn)
+        _ = pickle.dumps(post_fn, pickle.HIGHEST_PROTOCOL)
     except pickle.PickleError:
         raise ValueError('post_fn passed to make_pool is not picklable')
 
 
+def _mp_context():
+    # Forking is much cheaper than spawning a fresh interpreter for each
+    # worker, and the workers rely on inheriting the sys.path and test
+    # modules the parent has already set up. Newer versions of Python no
+    # longer default to fork on Linux, so we ask for it explicitly there.
+    if (hasattr(multiprocessing, 'get_context') and
+            sys.platform.startswith('linux')):  # pragma: python3
+        return multiprocessing.get_context('fork')
+    return multiprocessing
+
+
 class _ProcessPool(object):
 
     def __init__(self, host, jobs, callback, context, pre_fn, post_fn):
         self.host = host
         self.jobs = jobs
-        self.requests = multiprocessing.Queue()
-        self.responses = multiprocessing.Queue()
+        ctx = _mp_context()
+        self.requests = [ctx.Queue() for _ in range(jobs)]
+
+        # Responses go through a SimpleQueue, which pickles and writes
+        # directly to the pipe in the worker, rather than handing every
+        # message off to a background feeder thread the way Queue does.
+        # The requests need a full Queue, since the workers steal from
+        # each other's queues and the parent must never block on a put.
+        if host.is_python3:  # pragma: python3
+            self.responses = ctx.SimpleQueue()
+        else:  # pragma: python2
+            self.responses = multiprocessing.queues.SimpleQueue()
+        self.outstanding = collections.Counter()
+        self.pending_responses = collections.deque()
         self.workers = []
         self.discarded_responses = []
         self.closed = False
         self.erred = False
         for worker_num in range(1, jobs + 1):
-            w = multiprocessing.Process(target=_loop,
-                                        args=(self.requests, self.responses,
-                                              host.for_mp(), worker_num,
-                                              callback, context,
-                                              pre_fn, post_fn))
+            w = ctx.Process(target=_loop,
+                            args=(self.requests, self.responses,
+                                  host.for_mp(), worker_num,
+                                  callback, context,
+                                  pre_fn, post_fn))
             w.start()
             self.workers.append(w)
 
     def send(self, msg):
-        self.requests.put((_MessageType.Request, msg))
-
-    def get(self):
-        msg_type, resp = self.responses.get()
+        # Each request carries the number of the queue it was put on, and
+        # the response echoes it back, so that we charge the response to
+        # the right queue even if another worker stole the request.
+        queue_num = self._least_loaded_worker()
+        self.outstanding[queue_num] += 1
+        self.requests[queue_num - 1].put((_MessageType.Request,
+                                          (queue_num, msg)))
+
+    def send_batch(self, msgs):
+        # Sending a batch costs a single pickle and pipe write, rather than
+        # one per message; the worker still sends back one response per msg.
+        queue_num = self._least_loaded_worker()
+        self.outstanding[queue_num] += len(msgs)
+        self.requests[queue_num - 1].put((_MessageType.RequestBatch,
+                                          (queue_num, list(msgs))))
+
+    def _least_loaded_worker(self):
+        # Queue.qsize() is racy and unimplemented on some platforms, so
+        # we track how many requests on each queue have yet to be answered
+        # instead and hand new requests to the least loaded worker.
+        return min(range(1, len(self.requests) + 1),
+                   key=lambda num: self.outstanding[num])
+
+    def _next_response(self, block=True):
+        # Once we've blocked for one response, pull in whatever else is
+        # already waiting so later calls don't have to block. We only pull
+        # in a few per worker, though; the responses pipe has a fixed size,
+        # so leaving the rest there makes workers that are getting ahead
+        # of the parent wait, rather than piling their output up in memory.
+        if not self.pending_responses:
+            if not block and self.responses.empty():
+                raise Empty()
+            self.pending_responses.append(self.responses.get())
+            while (len(self.pending_responses) < self.jobs * 4 and
+                   not self.responses.empty()):
+                self.pending_responses.append(self.responses.get())
+        return self.pending_responses.popleft()
+
+    def get(self, block=True):
+        msg_type, resp = self._next_response(block)
         if msg_type == _MessageType.Error:
             self._handle_error(resp)
         elif msg_type == _MessageType.Interrupt:
             raise KeyboardInterrupt
         assert msg_type == _MessageType.Response
+        queue_num, resp = resp
+        self.outstanding[queue_num] -= 1
         return resp
 
     def close(self):
-        for _ in self.workers:
-            self.requests.put((_MessageType.Close, None))
+        for requests in self.requests:
+            requests.put((_MessageType.Close, None))
         self.closed = True
 
     def join(self):
@@ -118,7 +199,7 @@ class _ProcessPool(object):
         interrupted = None
         for w in self.workers:
             while True:
-                msg_type, resp = self.responses.get()
+                msg_type, resp = self._next_response()
                 if msg_type == _MessageType.Error:
                     error = resp
                     break
@@ -128,7 +209,7 @@ class _ProcessPool(object):
                 if msg_type == _MessageType.Done:
                     final_responses.append(resp[1])
                     break
-                self.discarded_responses.append(resp)
+                self.discarded_responses.append(resp[1])
 
         for w in self.workers:
             w.join()
@@ -156,17 +237,31 @@ def _loop(requests, responses, host, worker_num,
           callback, context, pre_fn, post_fn, should_loop=True):
     host = host or Host()
     try:
-        context_after_pre = pre_fn(host, worker_num, context)
+        if pre_fn:
+            context_after_pre = pre_fn(host, worker_num, context)
+        else:
+            context_after_pre = context
         keep_looping = True
         while keep_looping:
-            message_type, args = requests.get(block=True)
+            message_type, args = _get_request(requests, worker_num)
             if message_type == _MessageType.Close:
+                if post_fn:
+                    final_context = post_fn(context_after_pre)
+                else:
+                    final_context = None
                 responses.put((_MessageType.Done,
-                               (worker_num, post_fn(context_after_pre))))
+                               (worker_num, final_context)))
                 break
-            assert message_type == _MessageType.Request
-            resp = callback(context_after_pre, args)
-            responses.put((_MessageType.Response, resp))
+            if message_type == _MessageType.RequestBatch:
+                queue_num, msgs = args
+                for msg in msgs:
+                    resp = callback(context_after_pre, msg)
+                    responses.put((_MessageType.Response, (queue_num, resp)))
+            else:
+                assert message_type == _MessageType.Request
+                queue_num, msg = args
+                resp = callback(context_after_pre, msg)
+                responses.put((_MessageType.Response, (queue_num, resp)))
             keep_looping = should_loop
     except KeyboardInterrupt as e:
         responses.put((_MessageType.Interrupt, (worker_num, str(e))))
@@ -175,6 +270,32 @@ def _loop(requests, responses, host, worker_num,
                        (worker_num, traceback.format_exc(e))))
 
 
+def _get_request(requests, worker_num):
+    # Each worker has its own request queue, so that workers don't all
+    # contend on a single lock. When a worker's own queue runs dry, it
+    # steals from the other workers' queues, starting at a random one
+    # so that the thieves don't all pile onto the same victim. We only
+    # block (and then only briefly) once a pass over every queue has come
+    # up empty, so a worker never goes to sleep while work is waiting.
+    own_requests = requests[worker_num - 1]
+    block = False
+    while True:
+        try:
+            return own_requests.get(block=block, timeout=_STEAL_TIMEOUT)
+        except Empty:
+            pass
+        start = random.randrange(len(requests))
+        for i in range(len(requests)):
+            victim = requests[(start + i) % len(requests)]
+            if victim is own_requests:
+                continue
+            try:
+                return victim.get_nowait()
+            except Empty:
+                pass
+        block = True
+
+
 class _AsyncPool(object):
 
     def __init__(self, host, jobs, callback, context, pre_fn, post_fn):
@@ -182,21 +303,30 @@ class _AsyncPool(object):
         self.jobs = jobs
         self.callback = callback
         self.context = copy.deepcopy(context)
-        self.msgs = []
+        self.msgs = collections.deque()
         self.closed = False
         self.post_fn = post_fn
-        self.context_after_pre = pre_fn(self.host, 1, self.context)
+        if pre_fn:
+            self.context_after_pre = pre_fn(self.host, 1, self.context)
+        else:
+            self.context_after_pre = self.context
         self.final_context = None
 
     def send(self, msg):
         self.msgs.append(msg)
 
-    def get(self):
-        return self.callback(self.context_after_pre, self.msgs.pop(0))
+    def send_batch(self, msgs):
+        self.msgs.extend(msgs)
+
+    def get(self, block=True):
+        if not block and not self.msgs:
+            raise Empty()
+        return self.callback(self.context_after_pre, self.msgs.popleft())
 
     def close(self):
         self.closed = True
-        self.final_context = self.post_fn(self.context_after_pre)
+        if self.post_fn:
+            self.final_context = self.post_fn(self.context_after_pre)
 
     def join(self):
         if not self.closed:
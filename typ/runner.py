@@ -22,7 +22,7 @@ import sys
 import unittest
 import traceback
 
-from collections import OrderedDict
+from collections import OrderedDict, deque
 
 # This ensures that absolute imports of typ modules will work when
 # running typ/runner.py as a script even if typ is not installed.
@@ -40,7 +40,7 @@ if dir_above_typ not in sys.path:  # pragma: no cover
 from typ import json_results
 from typ.arg_parser import ArgumentParser
 from typ.host import Host
-from typ.pool import make_pool
+from typ.pool import make_pool, Empty
 from typ.stats import Stats
 from typ.printer import Printer
 from typ.test_case import TestCase as TypTestCase
@@ -435,6 +435,11 @@ class Runner(object):
             self.print_('\n'.join(all_tests))
             return 0, None
 
+        timings = self._read_timings()
+        if timings:
+            test_set.parallel_tests = _sort_inputs_by_timings(
+                test_set.parallel_tests, timings)
+
         self._run_one_set(self.stats, result_set, test_set)
 
         failed_tests = sorted(json_results.failed_test_names(result_set))
@@ -465,6 +470,12 @@ class Runner(object):
         if retry_limit != self.args.retry_limit:
             self.print_('')
 
+        if self.args.timings_file and not self.args.dry_run:
+            for result in result_set.results:
+                if result.actual != ResultType.Skip:
+                    timings[result.name] = result.took
+            self._write_timings(timings)
+
         full_results = json_results.make_full_results(self.args.metadata,
                                                       int(h.time()),
                                                       all_tests, result_set)
@@ -504,23 +515,67 @@ class Runner(object):
         if not jobs:
             return
 
+        if self.args.dry_run:
+            # Nothing actually gets run, so don't bother starting workers
+            # and sending every test through them.
+            for test_input in test_inputs:
+                last = h.time()
+                stats.started += 1
+                self._print_test_started(stats, test_input)
+                result = Result(test_input.name, actual=ResultType.Pass,
+                                started=last, took=(h.time() - last),
+                                worker=0, pid=h.getpid())
+                result_set.add(result)
+                stats.finished += 1
+                self._print_test_finished(stats, result)
+            return
+
+        # Sending the tests in batches amortizes the cost of getting each
+        # request to a worker when there are lots of fast tests, but a
+        # worker only ever takes a whole batch, so batches of neighbouring
+        # tests can pile a slow class onto a single worker. We only batch
+        # when asked to.
+        batch_size = self.args.batch_size or 1
+
+        # Taking tests off the front of a list is O(n) per test.
+        test_inputs = deque(test_inputs)
+
         child = _Child(self)
         pool = make_pool(h, jobs, _run_one_test, child,
                          _setup_process, _teardown_process)
+        # When running in parallel, we keep up to twice as many tests in
+        # flight as the workers can run at once, so that a worker that
+        # finishes never has to wait for us to get around to sending it more.
+        max_running = self.args.jobs * batch_size
+        if jobs > 1:
+            max_running *= 2
+
         try:
             while test_inputs or running_jobs:
-                while test_inputs and (len(running_jobs) < self.args.jobs):
-                    test_input = test_inputs.pop(0)
-                    stats.started += 1
-                    pool.send(test_input)
-                    running_jobs.add(test_input.name)
-                    self._print_test_started(stats, test_input)
-
-                result = pool.get()
-                running_jobs.remove(result.name)
-                result_set.add(result)
-                stats.finished += 1
-                self._print_test_finished(stats, result)
+                while test_inputs and len(running_jobs) < max_running:
+                    batch = [test_inputs.popleft() for _ in
+                             range(min(batch_size, len(test_inputs)))]
+                    # The workers only need the names, which are much
+                    # cheaper to pickle than the TestInputs.
+                    pool.send_batch([test_input.name for test_input in batch])
+                    for test_input in batch:
+                        stats.started += 1
+                        running_jobs.add(test_input.name)
+                        self._print_test_started(stats, test_input)
+
+                # Handle every result that has already come back before
+                # going back to sending more tests.
+                block = True
+                while running_jobs:
+                    try:
+                        result = pool.get(block=block)
+                    except Empty:
+                        break
+                    block = False
+                    running_jobs.remove(result.name)
+                    result_set.add(result)
+                    stats.finished += 1
+                    self._print_test_finished(stats, result)
             pool.close()
         finally:
             self.final_responses.extend(pool.join())
@@ -568,23 +623,22 @@ class Runner(object):
             if out or err:
                 suffix += ':\n'
             self.update(stats.format() + result.name + suffix, elide=False)
-            for l in out.splitlines():
-                self.print_('  %s' % l)
-            for l in err.splitlines():
-                self.print_('  %s' % l)
+            self._print_test_output(out, err)
         elif not self.args.quiet:
             if self.args.verbose > 1 and (out or err):
                 suffix += ':\n'
             self.update(stats.format() + result.name + suffix,
                         elide=(not self.args.verbose))
             if self.args.verbose > 1:
-                for l in out.splitlines():
-                    self.print_('  %s' % l)
-                for l in err.splitlines():
-                    self.print_('  %s' % l)
+                self._print_test_output(out, err)
             if self.args.verbose:
                 self.flush()
 
+    def _print_test_output(self, out, err):
+        lines = out.splitlines() + err.splitlines()
+        if lines:
+            self.print_('\n'.join('  %s' % l for l in lines))
+
     def update(self, msg, elide):
         self.printer.update(msg, elide)
 
@@ -622,6 +676,30 @@ class Runner(object):
                 h.remove(path)
         return obj
 
+    def _read_timings(self):
+        h = self.host
+        path = self.args.timings_file
+        if not path or not h.exists(path):
+            return {}
+        # A truncated or hand-edited file shouldn't stop the tests from
+        # running; we just lose the ordering until it's rewritten.
+        try:
+            timings = json.loads(h.read_text_file(path))
+        except ValueError:
+            return {}
+        if not isinstance(timings, dict):
+            return {}
+        return dict((name, took) for name, took in timings.items()
+                    if isinstance(took, (int, float)))
+
+    def _write_timings(self, timings):
+        # Write to a temporary file and rename it into place so that an
+        # interrupted run can't leave a truncated file behind.
+        path = self.args.timings_file
+        tmp_path = path + '.tmp'
+        self._write(tmp_path, timings)
+        self.host.rename(tmp_path, path)
+
     def _write(self, path, obj):
         if path:
             self.host.write_text_file(path, json.dumps(obj, indent=2) + '\n')
@@ -748,7 +826,6 @@ class _Child(object):
         self.debugger = parent.args.debugger
         self.coverage = parent.args.coverage and parent.args.jobs > 1
         self.coverage_source = parent.coverage_source
-        self.dry_run = parent.args.dry_run
         self.loader = parent.loader
         self.passthrough = parent.args.passthrough
         self.context = parent.context
@@ -757,6 +834,7 @@ class _Child(object):
         self.context_after_setup = None
         self.top_level_dir = parent.top_level_dir
         self.loaded_suites = {}
+        self.test_modules = {}
         self.cov = None
 
 
@@ -795,10 +873,9 @@ def _teardown_process(child):
     return (child.worker_num, res, e)
 
 
-def _run_one_test(child, test_input):
+def _run_one_test(child, test_name):
     h = child.host
     pid = h.getpid()
-    test_name = test_input.name
 
     start = h.time()
 
@@ -820,7 +897,7 @@ def _run_one_test(child, test_input):
             unittest.skipIf = lambda condition, reason: lambda x: x
 
         try:
-            suite = child.loader.loadTestsFromName(test_name)
+            suite = _load_tests_from_name(child, test_name)
         except Exception as e:
             ex_str = ('loadTestsFromName("%s") failed: %s\n%s\n' %
                       (test_name, e, traceback.format_exc()))
@@ -856,9 +933,7 @@ def _run_one_test(child, test_input):
     out = ''
     err = ''
     try:
-        if child.dry_run:
-            pass
-        elif child.debugger:  # pragma: no cover
+        if child.debugger:  # pragma: no cover
             _run_under_debugger(h, test_case, suite, test_result)
         else:
             suite.run(test_result)
@@ -923,6 +998,29 @@ def _result_from_test_result(test_result, test_name, start, took, out, err,
                   expected, unexpected, flaky, code, out, err, pid)
 
 
+def _load_tests_from_name(child, test_name):
+    # Loading a test by its full name makes the loader try to import
+    # successively shorter prefixes of the name until one works. Once we
+    # know which module a test class lives in, we can look the module up
+    # in sys.modules and have the loader resolve just the rest of the name.
+    class_name = test_name.rsplit('.', 1)[0]
+    module_name = child.test_modules.get(class_name)
+    module = sys.modules.get(module_name) if module_name else None
+    if module:
+        return child.loader.loadTestsFromName(
+            test_name[len(module_name) + 1:], module)
+
+    suite = child.loader.loadTestsFromName(test_name)
+    comps = test_name.split('.')
+    while comps:
+        name = '.'.join(comps)
+        if name in sys.modules:
+            child.test_modules[class_name] = name
+            break
+        comps.pop()
+    return suite
+
+
 def _load_via_load_tests(child, test_name):
     # If we couldn't import a test directly, the test may be only loadable
     # via unittest's load_tests protocol. See if we can find a load_tests
@@ -958,6 +1056,16 @@ def _sort_inputs(inps):
     return sorted(inps, key=lambda inp: inp.name)
 
 
+def _sort_inputs_by_timings(inps, timings):
+    # Running the slowest tests first keeps a long test from being started
+    # last and leaving the other workers idle while it finishes. Tests
+    # we have no timing for are assumed to take the median time.
+    times = sorted(timings.values())
+    median = times[len(times) // 2] if times else 0
+    return sorted(inps, key=lambda inp: timings.get(inp.name, median),
+                  reverse=True)
+
+
 if __name__ == '__main__':  # pragma: no cover
     sys.modules['__main__'].__file__ = path_to_file
     sys.exit(main(win_multiprocessing=WinMultiprocessing.importable))
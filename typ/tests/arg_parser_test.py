@@ -74,3 +74,12 @@ class ArgumentParserTest(unittest.TestCase):
 
         parser.parse_args(['--total-shards', '5', '--shard-index', '6'])
         self.assertEqual(parser.exit_status, 2)
+
+    def test_batch_size_options(self):
+        parser = ArgumentParser()
+
+        parser.parse_args(['--batch-size', '0'])
+        self.assertEqual(parser.exit_status, None)
+
+        parser.parse_args(['--batch-size', '-1'])
+        self.assertEqual(parser.exit_status, 2)
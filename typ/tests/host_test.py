@@ -12,12 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
 import logging
 import pickle
 import sys
 import unittest
 
-from typ.host import Host
+from typ.host import Host, _TeedStream
 
 
 class TestHost(unittest.TestCase):
@@ -83,6 +84,11 @@ class TestHost(unittest.TestCase):
             self.assertTrue(h.isfile(dirpath, 'bar', 'foo.txt'))
             self.assertFalse(h.isdir(dirpath, 'bar', 'foo.txt'))
 
+            h.write_text_file('bar/foo.tmp', 'new foo')
+            h.rename('bar/foo.tmp', 'bar/foo.txt')
+            self.assertFalse(h.exists('bar', 'foo.tmp'))
+            self.assertEqual(h.read_text_file('bar/foo.txt'), 'new foo')
+
             h.write_binary_file('binfile', b'bin contents')
             self.assertEqual(h.read_binary_file('binfile'),
                              b'bin contents')
@@ -173,6 +179,32 @@ class TestHost(unittest.TestCase):
         h.print_('hello', '')
         self.assertEqual(s.contents, 'hello')
 
+    def test_print_to_pipe(self):
+        h = self.host()
+
+        class FakePipe(object):
+
+            def __init__(self):
+                self.flush_called = False
+
+            def write(self, m):
+                pass
+
+            def flush(self):
+                self.flush_called = True
+
+            def isatty(self):
+                return False
+
+        # Complete lines are left in the stream's buffer ...
+        s = FakePipe()
+        h.print_('hello', stream=s)
+        self.assertFalse(s.flush_called)
+
+        # ... but partial lines are flushed right away.
+        h.print_('hello', end='', stream=s)
+        self.assertTrue(s.flush_called)
+
     def test_call(self):
         h = self.host()
         ret, out, err = h.call(
@@ -214,3 +246,34 @@ class TestHost(unittest.TestCase):
     def test_platform(self):
         h = self.host()
         self.assertNotEqual(h.platform, None)
+
+
+class TestTeedStream(unittest.TestCase):
+
+    def test_capture_and_restore(self):
+        stream = io.StringIO()
+        teed = _TeedStream(stream)
+
+        teed.capture(divert=True)
+        teed.write(u'diverted')
+        self.assertEqual(teed.restore(), u'diverted')
+        self.assertEqual(stream.getvalue(), u'')
+
+        teed.capture(divert=False)
+        teed.write(u'passed through')
+        self.assertEqual(teed.restore(), u'passed through')
+        self.assertEqual(stream.getvalue(), u'passed through')
+
+        teed.write(u'!')
+        self.assertEqual(stream.getvalue(), u'passed through!')
+
+    def test_capture_twice_without_restore(self):
+        stream = io.StringIO()
+        teed = _TeedStream(stream)
+
+        teed.capture(divert=True)
+        teed.write(u'diverted')
+        teed.capture(divert=False)
+        teed.write(u'passed through')
+        self.assertEqual(stream.getvalue(), u'passed through')
+        self.assertEqual(teed.restore(), u'passed through')
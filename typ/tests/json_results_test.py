@@ -12,11 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pickle
 import unittest
 
 from typ import json_results
 
 
+class TestResult(unittest.TestCase):
+
+    def test_pickling(self):
+        result = json_results.Result('foo_test.FooTest.test_fail',
+                                     json_results.ResultType.Failure, 1, 2, 3,
+                                     unexpected=True, code=1, out='out',
+                                     err='err', pid=4)
+        new_result = pickle.loads(pickle.dumps(result))
+        self.assertEqual(vars(new_result), vars(result))
+
+
 class TestMakeUploadRequest(unittest.TestCase):
     maxDiff = 4096
 
@@ -183,6 +183,10 @@ class TestCli(test_case.MainTestCase):
                    rerr=(".*: error: argument -h/--help: "
                          "ignored explicit argument 'elp'\n"))
 
+    def test_bad_batch_size(self):
+        self.check(['--batch-size', '-1'], ret=2, err='',
+                   out='Error: --batch-size must be at least 0\n')
+
     def test_bad_metadata(self):
         self.check(['--metadata', 'foo'], ret=2, err='',
                    out='Error: malformed --metadata "foo"\n')
@@ -193,6 +197,26 @@ class TestCli(test_case.MainTestCase):
                    out=('[1/1] pass_test.PassingTest.test_pass passed\n'
                         '1 test run, 0 failures.\n'), err='')
 
+    def test_batch_size(self):
+        files = {'batch_test.py': d("""\
+                                    import unittest
+                                    class BatchTest(unittest.TestCase):
+                                        def test_01(self):
+                                            pass
+
+                                        def test_02(self):
+                                            pass
+
+                                        def test_03(self):
+                                            pass
+                                    """)}
+        _, out, _, _ = self.check(['--batch-size', '2'], files=files,
+                                  ret=0, err='')
+        self.assertIn('batch_test.BatchTest.test_01 passed', out)
+        self.assertIn('batch_test.BatchTest.test_02 passed', out)
+        self.assertIn('batch_test.BatchTest.test_03 passed', out)
+        self.assertIn('3 tests run, 0 failures.\n', out)
+
     def test_coverage(self):
         try:
             import coverage  # pylint: disable=W0612
@@ -696,6 +720,57 @@ class TestCli(test_case.MainTestCase):
                          2 tests run, 0 failures.
                          """), err='')
 
+    def test_timings_file(self):
+        files = {'timing_test.py': d("""\
+                                     import unittest
+                                     class TimingTest(unittest.TestCase):
+                                         def test_01(self):
+                                             pass
+
+                                         def test_02(self):
+                                             pass
+
+                                         def test_03(self):
+                                             pass
+                                     """),
+                 'timings.json': json.dumps({
+                     'timing_test.TimingTest.test_01': 1.0,
+                     'timing_test.TimingTest.test_03': 3.0,
+                     'timing_test.TimingTest.test_04': 2.0})}
+        _, out, _, files = self.check(['--timings-file', 'timings.json',
+                                       '-j', '1'],
+                                      files=files, ret=0, err='')
+        self.assertEqual(out, d("""\
+                                [1/3] timing_test.TimingTest.test_03 passed
+                                [2/3] timing_test.TimingTest.test_02 passed
+                                [3/3] timing_test.TimingTest.test_01 passed
+                                3 tests run, 0 failures.
+                                """))
+        timings = json.loads(files['timings.json'])
+        self.assertEqual(sorted(timings.keys()),
+                         ['timing_test.TimingTest.test_01',
+                          'timing_test.TimingTest.test_02',
+                          'timing_test.TimingTest.test_03',
+                          'timing_test.TimingTest.test_04'])
+        self.assertLess(timings['timing_test.TimingTest.test_03'], 3.0)
+
+    def test_timings_file_dry_run(self):
+        timings = json.dumps({'pass_test.PassingTest.test_pass': 1.0})
+        files = dict(PASS_TEST_FILES)
+        files['timings.json'] = timings
+        _, _, _, files = self.check(['--timings-file', 'timings.json', '-n'],
+                                    files=files, ret=0, err='')
+        self.assertEqual(files['timings.json'], timings)
+
+    def test_timings_file_invalid(self):
+        files = dict(PASS_TEST_FILES)
+        files['timings.json'] = '{"pass_test.PassingTest.test_pass": 1'
+        _, _, _, files = self.check(['--timings-file', 'timings.json'],
+                                    files=files, ret=0, err='')
+        self.assertIn('pass_test.PassingTest.test_pass',
+                      json.loads(files['timings.json']))
+        self.assertNotIn('timings.json.tmp', files)
+
     def test_version(self):
         self.check('--version', ret=0, out=(VERSION + '\n'))
 
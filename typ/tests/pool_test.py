@@ -12,12 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import multiprocessing
 import sys
 import unittest
 
 from typ import test_case
 from typ.host import Host
-from typ.pool import make_pool, _MessageType, _ProcessPool, _loop
+from typ.pool import make_pool, Empty, _MessageType, _ProcessPool, _loop
 
 
 def _pre(host, worker_num, context):  # pylint: disable=W0613
@@ -34,6 +35,10 @@ def _echo(context, msg):
     return '%s/%s/%s' % (context['pre'], context['post'], msg)
 
 
+def _echo_msg(context, msg):  # pylint: disable=W0613
+    return msg
+
+
 def _error(context, msg):  # pylint: disable=W0613
     raise Exception('_error() raised Exception')
 
@@ -65,6 +70,19 @@ class TestPool(test_case.TestCase):
         expected_final_contexts = [expected_context for _ in range(jobs)]
         self.assertEqual(final_contexts, expected_final_contexts)
 
+    def run_batch_test(self, jobs):
+        host = Host()
+        context = {'pre': False, 'post': False}
+        pool = make_pool(host, jobs, _echo, context, _pre, _post)
+        pool.send_batch(['hello', 'world'])
+        msg1 = pool.get()
+        msg2 = pool.get()
+        pool.close()
+        pool.join()
+        self.assertEqual(set([msg1, msg2]),
+                         set(['True/False/hello',
+                              'True/False/world']))
+
     def run_through_loop(self, callback=None, pool=None):
         callback = callback or _stub
         if pool:
@@ -72,6 +90,7 @@ class TestPool(test_case.TestCase):
         else:
             host = Host()
             pool = _ProcessPool(host, 0, _stub, None, _stub, _stub)
+            pool.requests.append(multiprocessing.Queue())
             pool.send('hello')
 
         worker_num = 1
@@ -90,6 +109,20 @@ class TestPool(test_case.TestCase):
     def test_basic_two_jobs(self):
         self.run_basic_test(2)
 
+    def test_batch_one_job(self):
+        self.run_batch_test(1)
+
+    def test_batch_two_jobs(self):
+        self.run_batch_test(2)
+
+    def test_get_nonblocking(self):
+        host = Host()
+        for jobs in (1, 2):
+            pool = make_pool(host, jobs, _echo, None, _stub, _stub)
+            self.assertRaises(Empty, pool.get, block=False)
+            pool.close()
+            pool.join()
+
     def test_join_discards_messages(self):
         host = Host()
         context = {'pre': False, 'post': False}
@@ -121,7 +154,7 @@ class TestPool(test_case.TestCase):
         pool = self.run_through_loop()
         resp = pool.get()
         self.assertEqual(resp, None)
-        pool.requests.put((_MessageType.Close, None))
+        pool.requests[0].put((_MessageType.Close, None))
         pool.close()
         self.run_through_loop(pool=pool)
         pool.join()
@@ -131,8 +164,8 @@ class TestPool(test_case.TestCase):
         # on a closed queue; we can't simulate this directly through the
         # api in a single thread.
         pool = self.run_through_loop()
-        pool.requests.put((_MessageType.Request, None))
-        pool.requests.put((_MessageType.Close, None))
+        pool.requests[0].put((_MessageType.Request, (1, None)))
+        pool.requests[0].put((_MessageType.Close, None))
         self.run_through_loop(pool=pool)
         pool.join()
 
@@ -140,17 +173,26 @@ class TestPool(test_case.TestCase):
     def test_loop_get_raises_error(self):
         pool = self.run_through_loop(_error)
         self.assertRaises(Exception, pool.get)
-        pool.requests.put((_MessageType.Close, None))
+        pool.requests[0].put((_MessageType.Close, None))
         pool.close()
         pool.join()
 
     def test_loop_get_raises_interrupt(self):
         pool = self.run_through_loop(_interrupt)
         self.assertRaises(KeyboardInterrupt, pool.get)
-        pool.requests.put((_MessageType.Close, None))
+        pool.requests[0].put((_MessageType.Close, None))
         pool.close()
         pool.join()
 
+    def test_no_pre_or_post_fn(self):
+        host = Host()
+        for jobs in (1, 2):
+            pool = make_pool(host, jobs, _echo_msg, None)
+            pool.send('hello')
+            self.assertEqual(pool.get(), 'hello')
+            pool.close()
+            self.assertEqual(pool.join(), [None] * jobs)
+
     def test_pickling_errors(self):
         def unpicklable_fn():  # pragma: no cover
             pass
@@ -164,6 +206,50 @@ class TestPool(test_case.TestCase):
         self.assertRaises(Exception, make_pool,
                           host, jobs, _stub, None, None, unpicklable_fn)
 
+    def test_idle_worker_steals_requests(self):
+        host = Host()
+        pool = _ProcessPool(host, 0, _stub, None, _stub, _stub)
+        pool.requests.append(multiprocessing.Queue())
+        pool.requests.append(multiprocessing.Queue())
+        pool.outstanding[2] += 1
+        pool.requests[1].put((_MessageType.Request, (2, 'hello')))
+        pool.requests[1].put((_MessageType.Close, None))
+        _loop(pool.requests, pool.responses, host, 1, _echo_msg,
+              None, _stub, _stub, should_loop=False)
+        self.assertEqual(pool.get(), 'hello')
+
+        # The response is charged to the queue the request was sent to,
+        # not to the worker that stole it.
+        self.assertEqual(pool.outstanding[1], 0)
+        self.assertEqual(pool.outstanding[2], 0)
+        _loop(pool.requests, pool.responses, host, 1, _echo_msg,
+              None, _stub, _stub, should_loop=False)
+        pool.close()
+        pool.join()
+
+    def test_send_prefers_least_loaded_worker(self):
+        host = Host()
+        pool = _ProcessPool(host, 0, _stub, None, _stub, _stub)
+        pool.requests.append(multiprocessing.Queue())
+        pool.requests.append(multiprocessing.Queue())
+        pool.send('hello')
+        pool.send('world')
+        self.assertEqual(pool.outstanding[1], 1)
+        self.assertEqual(pool.outstanding[2], 1)
+        pool.close()
+        pool.join()
+
+    def test_close_stops_every_worker(self):
+        # close() puts one Close on each worker's queue; even if idle
+        # workers steal each other's Closes, every worker should exit.
+        host = Host()
+        context = {'pre': False, 'post': False}
+        pool = make_pool(host, 4, _echo, context, _pre, _post)
+        pool.close()
+        final_contexts = pool.join()
+        self.assertEqual(final_contexts,
+                         [{'pre': True, 'post': True} for _ in range(4)])
+
     def test_no_close(self):
         host = Host()
         context = {'pre': False, 'post': False}
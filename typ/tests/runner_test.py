@@ -82,6 +82,22 @@ class TestSetTests(TestCase):
         ret, _, _ = r.run(test_set)
         self.assertEqual(ret, 1)
 
+    def test_tests_from_same_class(self):
+        test_set = TestSet()
+        test_set.parallel_tests = [
+            TestInput('typ.tests.runner_test.ContextTests.test_context'),
+            TestInput('typ.tests.runner_test.ContextTests.test_missing'),
+        ]
+        r = Runner()
+        r.args.jobs = 1
+        ret, full_results, _ = r.run(test_set)
+        self.assertEqual(ret, 1)
+        tests = full_results['tests']['typ']['tests']['runner_test']
+        self.assertEqual(tests['ContextTests']['test_context']['actual'],
+                         'PASS')
+        self.assertEqual(tests['ContextTests']['test_missing']['actual'],
+                         'FAIL')
+
     def test_failing_load_test(self):
         h = Host()
         orig_wd = h.getcwd()